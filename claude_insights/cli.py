@@ -1,25 +1,37 @@
 """CLI entry point — argparse, main loop, report opening."""
 
 import argparse
+import asyncio
+import hashlib
 import platform
+import queue
 import subprocess
 import sys
+import threading
 import time
 from pathlib import Path
 
 from claude_insights.gemini import (
     check_gemini_cli,
+    clear_llm_cache,
     generate_report,
+    iter_batches,
+    llm_cache_dir,
     make_batches,
     process_batch,
+    read_prompt,
     save_facet,
+    set_rate_limit,
 )
 from claude_insights.sessions import (
-    clean_transcript,
+    clean_transcripts_parallel,
+    compute_aggregate_stats_db,
     discover_sessions,
     filter_cached,
+    iso_to_epoch,
     list_projects,
     load_all_facets,
+    update_facets_db,
 )
 
 # ---------------------------------------------------------------------------
@@ -29,6 +41,131 @@ DEFAULT_SESSIONS_DIR = Path.home() / ".claude" / "projects"
 DEFAULT_OUTPUT_DIR = Path.home() / ".claude" / "custom-insights"
 
 
+def _iter_extracted(to_process, counts):
+    """Yield cleaned transcript items, tallying into `counts`."""
+    cleaned = clean_transcripts_parallel(s["path"] for s in to_process)
+    for s, (transcript, start_ts, end_ts) in zip(to_process, cleaned):
+        if not transcript.strip():
+            counts["empty"] += 1
+            continue
+        counts["extracted"] += 1
+        counts["chars"] += len(transcript)
+        yield {
+            **s,
+            "transcript": transcript,
+            "start_ts": start_ts,
+            "end_ts": end_ts,
+        }
+
+
+def _produce_batches(to_process, out_queue, counts, siblings, failure):
+    """Producer thread: extract, dedup, and batch sessions into a queue.
+
+    A trailing None marks the end of the stream — enqueued even if
+    extraction raises, so the consumer never blocks on a dead producer;
+    the exception is recorded in `failure` for the main thread to
+    re-raise. Running in a thread keeps disk reads off the event loop
+    that drives the Gemini calls.
+    """
+    try:
+        items = _dedup_items(_iter_extracted(to_process, counts), siblings)
+        for batch, chars in iter_batches(items):
+            out_queue.put((batch, chars))
+    except Exception as exc:
+        failure.append(exc)
+    finally:
+        out_queue.put(None)
+
+
+async def _run_batches(batch_queue, facet_prompt, facets_dir, concurrency,
+                       verbose):
+    """Drain the batch queue, running up to `concurrency` Gemini calls.
+
+    Returns the combined list of (session_id, facet) tuples.
+    """
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run_one(batch, chars, idx):
+        async with semaphore:
+            return await process_batch(
+                batch, chars, facet_prompt, idx, None, facets_dir,
+                verbose=verbose,
+            )
+
+    tasks = []
+    while True:
+        entry = await loop.run_in_executor(None, batch_queue.get)
+        if entry is None:
+            break
+        batch, chars = entry
+        tasks.append(asyncio.create_task(run_one(batch, chars, len(tasks) + 1)))
+
+    # One status line per batch, as each completes
+    results = []
+    done = 0
+    for future in asyncio.as_completed(tasks):
+        br = await future
+        done += 1
+        progress = f"{done}/{len(tasks)} batches"
+        if br.error:
+            print(f"  [Batch {br.batch_idx}] FAILED: {br.error} ({progress})")
+        else:
+            print(
+                f"  [Batch {br.batch_idx}] done ({br.latency_ms // 1000}s, "
+                f"{len(br.results)} facets, {progress})"
+            )
+        results.extend(br.results)
+    return results
+
+
+def _dedup_items(items, siblings):
+    """Drop exact-duplicate transcripts, keeping one representative each.
+
+    Duplicates are recorded in `siblings` (representative session_id ->
+    list of duplicate items); after processing, the representative's
+    facet is fanned out to them instead of paying a Gemini call apiece.
+    """
+    reps = {}
+    for item in items:
+        digest = hashlib.blake2b(item["transcript"], digest_size=16).digest()
+        rep_sid = reps.get(digest)
+        if rep_sid is not None:
+            siblings.setdefault(rep_sid, []).append(item)
+            continue
+        reps[digest] = item["session_id"]
+        yield item
+
+
+def _fan_out_duplicates(siblings, newly_generated, facets_dir):
+    """Replicate each representative facet across its duplicate sessions.
+
+    Returns the number of facets fanned out.
+    """
+    facet_by_id = dict(newly_generated)
+    fanned_out = 0
+    for rep_sid, dup_items in siblings.items():
+        facet = facet_by_id.get(rep_sid)
+        if facet is None:
+            continue  # representative's batch failed; leave dupes uncached
+        for item in dup_items:
+            dup_facet = dict(facet)
+            dup_facet["session_id"] = item["session_id"]
+            dup_facet["project"] = item["project"]
+            dup_facet["start_timestamp"] = item.get("start_ts")
+            dup_facet["end_timestamp"] = item.get("end_ts")
+            start_epoch = iso_to_epoch(item.get("start_ts"))
+            if start_epoch is not None:
+                dup_facet["start_epoch"] = start_epoch
+            else:
+                dup_facet.pop("start_epoch", None)
+            dup_facet["_source_mtime"] = item["mtime"]
+            save_facet(item["session_id"], dup_facet, facets_dir)
+            newly_generated.append((item["session_id"], dup_facet))
+            fanned_out += 1
+    return fanned_out
+
+
 def open_report(path):
     """Open the report in the default browser."""
     system = platform.system()
@@ -81,6 +218,18 @@ def main():
         "--verbose", action="store_true",
         help="Detailed progress output",
     )
+    parser.add_argument(
+        "--concurrency", type=int, default=4,
+        help="Parallel Gemini calls (default: 4)",
+    )
+    parser.add_argument(
+        "--rpm", type=int, default=0,
+        help="Max Gemini requests per minute (0 = unlimited)",
+    )
+    parser.add_argument(
+        "--clear-llm-cache", action="store_true",
+        help="Delete the cached Gemini responses and exit",
+    )
     parser.add_argument(
         "--sessions-dir", type=Path,
         default=DEFAULT_SESSIONS_DIR,
@@ -96,6 +245,12 @@ def main():
     facets_dir = args.output_dir / "facets"
     prompts_dir = Path(__file__).parent / "prompts"
 
+    # --clear-llm-cache mode
+    if args.clear_llm_cache:
+        clear_llm_cache()
+        print(f"Cleared LLM response cache ({llm_cache_dir()})")
+        return
+
     # --list-projects mode
     if args.list_projects:
         projects = list_projects(facets_dir)
@@ -128,6 +283,10 @@ def main():
         report_path = generate_report(
             facets, prompts_dir, args.output_dir,
             verbose=args.verbose, project_slug=args.project,
+            stats=compute_aggregate_stats_db(
+                facets_dir, project_filter=args.project,
+                since_days=args.since,
+            ),
         )
         if report_path:
             print(f"\nReport: {report_path}")
@@ -139,13 +298,12 @@ def main():
 
     # Phase 1: Discover
     print("Phase 1: Discovering sessions...")
-    sessions = discover_sessions(
+    sessions, n_projects = discover_sessions(
         args.sessions_dir,
         project_filter=args.project,
         since_days=args.since,
         limit=args.limit,
     )
-    n_projects = len(set(s["project"] for s in sessions))
     print(f"  Found {len(sessions)} sessions across {n_projects} projects")
 
     if not sessions:
@@ -165,51 +323,34 @@ def main():
         report_path = generate_report(
             facets, prompts_dir, args.output_dir,
             verbose=args.verbose, project_slug=args.project,
+            stats=compute_aggregate_stats_db(
+                facets_dir, project_filter=args.project,
+                since_days=args.since,
+            ),
         )
         if report_path:
             print(f"\nReport: {report_path}")
             open_report(report_path)
         return
 
-    # Extract transcripts
-    print("\nExtracting transcripts...")
-    items = []
-    empty_count = 0
-    for s in to_process:
-        transcript, start_ts, end_ts = clean_transcript(s["path"])
-        if not transcript.strip():
-            empty_count += 1
-            continue
-        items.append({
-            **s,
-            "transcript": transcript,
-            "start_ts": start_ts,
-            "end_ts": end_ts,
-        })
-
-    total_chars = sum(len(item["transcript"]) for item in items)
-    print(
-        f"  Extracted {len(items)} transcripts "
-        f"({total_chars // 1000}K chars total)"
-    )
-    if empty_count:
-        print(f"  Skipped {empty_count} empty sessions")
-
-    if not items:
-        print("No transcripts to process.")
-        return
-
-    # Phase 2: Batch and process
-    batches = make_batches(items)
-    print(
-        f"\nPhase 2: Processing {len(items)} sessions "
-        f"in {len(batches)} batches"
-    )
-
+    # --dry-run: extract everything up front so the full plan can be shown
     if args.dry_run:
-        print("\n--- DRY RUN ---")
-        for i, batch in enumerate(batches, 1):
-            chars = sum(len(item["transcript"]) for item in batch)
+        print("\nExtracting transcripts...")
+        counts = {"extracted": 0, "empty": 0, "chars": 0}
+        items = list(_iter_extracted(to_process, counts))
+        print(
+            f"  Extracted {counts['extracted']} transcripts "
+            f"({counts['chars'] // 1000}K chars total)"
+        )
+        if counts["empty"]:
+            print(f"  Skipped {counts['empty']} empty sessions")
+
+        batches = make_batches(items)
+        print(
+            f"\n--- DRY RUN: {len(items)} sessions "
+            f"in {len(batches)} batches ---"
+        )
+        for i, (batch, chars) in enumerate(batches, 1):
             print(f"  Batch {i}: {len(batch)} sessions, {chars // 1000}K chars")
             if args.verbose:
                 for item in batch:
@@ -220,30 +361,90 @@ def main():
                     )
         return
 
-    # Load facet prompt
-    facet_prompt = (prompts_dir / "facet_prompt.txt").read_text()
+    # Load facet prompt, encoded once for bytes prompt assembly
+    facet_prompt = read_prompt(prompts_dir / "facet_prompt.txt").encode("utf-8")
+
+    # Phase 2: a producer thread streams cleaned transcripts into the
+    # batcher, so the first Gemini call fires while later sessions are
+    # still being read off disk; an event loop multiplexes the calls
+    print(
+        f"\nPhase 2: Extracting and processing "
+        f"{len(to_process)} sessions..."
+    )
+    batch_queue = queue.Queue(maxsize=8)
+    counts = {"extracted": 0, "empty": 0, "chars": 0}
+    siblings = {}
+    producer_failure = []
+    producer = threading.Thread(
+        target=_produce_batches,
+        args=(to_process, batch_queue, counts, siblings, producer_failure),
+        daemon=True,
+    )
+    producer.start()
 
-    total_facets = 0
     start_time = time.time()
+    set_rate_limit(args.rpm)
+
+    newly_generated = asyncio.run(_run_batches(
+        batch_queue, facet_prompt, facets_dir, args.concurrency,
+        args.verbose,
+    ))
+    producer.join()
+
+    if producer_failure:
+        # Facets from batches that completed are already saved; fail as
+        # loudly as a crash in the extraction itself would have
+        raise producer_failure[0]
 
-    for i, batch in enumerate(batches, 1):
-        results = process_batch(
-            batch, facet_prompt, i, len(batches), verbose=args.verbose,
+    if siblings:
+        fanned_out = _fan_out_duplicates(siblings, newly_generated, facets_dir)
+        n_dupes = sum(len(items) for items in siblings.values())
+        print(
+            f"  Deduplicated {n_dupes} identical transcripts "
+            f"({fanned_out} facets replicated without a Gemini call)"
         )
-        for session_id, facet in results:
-            save_facet(session_id, facet, facets_dir)
-            total_facets += 1
+
+    update_facets_db(facets_dir, [facet for _, facet in newly_generated])
 
     elapsed = time.time() - start_time
-    print(f"\nPhase 2 complete: {total_facets} facets in {elapsed:.0f}s")
+    summary = (
+        f"  Extracted {counts['extracted']} transcripts "
+        f"({counts['chars'] // 1000}K chars total)"
+    )
+    if counts["empty"]:
+        summary += f", skipped {counts['empty']} empty"
+    print(f"\n{summary}")
+
+    if not counts["extracted"]:
+        print("No transcripts to process.")
+        return
+
+    print(f"Phase 2 complete: {len(newly_generated)} facets in {elapsed:.0f}s")
 
-    # Phase 3: Generate report
+    # Phase 3: Generate report — new facets are already in memory, so
+    # only the previously-cached portion is read back from disk. Without
+    # --limit the discovered sessions define the report scope, so their
+    # facets can be opened directly with no directory enumeration.
     print("\nPhase 3: Generating report...")
-    facets = load_all_facets(
-        facets_dir, project_filter=args.project, since_days=args.since,
-    )
+    new_ids = {sid for sid, _ in newly_generated}
+    if args.limit is None:
+        cached_ids = {s["session_id"] for s in sessions} - new_ids
+        facets = load_all_facets(
+            facets_dir, project_filter=args.project, since_days=args.since,
+            session_ids=cached_ids,
+        )
+    else:
+        facets = load_all_facets(
+            facets_dir, project_filter=args.project, since_days=args.since,
+            skip_ids=new_ids,
+        )
+    facets += [facet for _, facet in newly_generated]
     print(f"  Total facets (cached + new): {len(facets)}")
 
+    # Stats are computed from the facets list here, not the SQLite
+    # index: the list is scoped to currently-discovered sessions, while
+    # the index also keeps rows for sessions whose files are gone, and
+    # the report's stats and facet sections must agree
     report_path = generate_report(
         facets, prompts_dir, args.output_dir,
         verbose=args.verbose, project_slug=args.project,
@@ -1,16 +1,50 @@
 """LLM layer — Gemini CLI calls, batching, facet parsing, report generation."""
 
+import asyncio
+import hashlib
 import json
 import os
+import random
+import re
 import shutil
-import subprocess
 import sys
 import tempfile
+import threading
 import time
+from collections import namedtuple
 from datetime import datetime, timezone
+from functools import lru_cache
 from pathlib import Path
 
-from claude_insights.sessions import compute_aggregate_stats, compute_temporal_stats
+from claude_insights.sessions import (
+    compute_aggregate_stats,
+    compute_temporal_stats,
+    iso_to_epoch,
+    upsert_facet_db,
+)
+
+try:  # optional accelerator for large JSON payloads
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _dumps(obj, indent=False):
+    """Serialize to a JSON string, via orjson when it is installed."""
+    if orjson is not None:
+        option = orjson.OPT_INDENT_2 if indent else 0
+        return orjson.dumps(obj, option=option).decode("utf-8")
+    if indent:
+        return json.dumps(obj, indent=2)
+    return json.dumps(obj, separators=(",", ":"))
+
+
+def _loads(data):
+    """Parse JSON from bytes or str, via orjson when it is installed."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
 
 # ---------------------------------------------------------------------------
 # Constants
@@ -18,7 +52,106 @@ from claude_insights.sessions import compute_aggregate_stats, compute_temporal_s
 BATCH_SIZE = 12
 BATCH_CHAR_LIMIT = 700_000
 MAX_RETRIES = 3
-RETRY_BACKOFF = [30, 60, 120]
+BACKOFF_BASE = 30  # seconds
+BACKOFF_CAP = 300
+BACKOFF_JITTER = 10
+
+# Opt-in disk cache for Gemini responses, keyed by prompt hash
+LLM_CACHE_ENV = "CLAUDE_INSIGHTS_LLM_CACHE"
+LLM_CACHE_TTL = 7 * 86400  # seconds
+
+# Lock so progress lines from parallel workers don't interleave mid-line
+_PRINT_LOCK = threading.Lock()
+
+
+def _log(msg):
+    """Print a full progress line, safe to call from worker threads."""
+    with _PRINT_LOCK:
+        print(msg, flush=True)
+
+
+# ---------------------------------------------------------------------------
+# Prompt templates
+# ---------------------------------------------------------------------------
+
+@lru_cache(maxsize=8)
+def _read_prompt_cached(path_str, mtime_ns):
+    return Path(path_str).read_text()
+
+
+def read_prompt(path):
+    """Read a prompt file, memoized on (path, mtime)."""
+    path = Path(path)
+    return _read_prompt_cached(str(path), path.stat().st_mtime_ns)
+
+
+# ---------------------------------------------------------------------------
+# Rate limiting
+# ---------------------------------------------------------------------------
+
+class RateLimiter:
+    """Token-bucket limiter spacing Gemini calls at most `rpm` per minute."""
+
+    def __init__(self, rpm):
+        self.interval = 60.0 / rpm
+        self._lock = threading.Lock()
+        self._next_slot = time.monotonic()
+
+    def reserve(self):
+        """Claim the next request slot; returns seconds to wait for it."""
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next_slot - now
+            self._next_slot = max(self._next_slot, now) + self.interval
+        return max(wait, 0.0)
+
+
+_rate_limiter = None
+
+
+def set_rate_limit(rpm):
+    """Install a global rate limiter for call_gemini (0/None = unlimited)."""
+    global _rate_limiter
+    _rate_limiter = RateLimiter(rpm) if rpm else None
+
+
+# ---------------------------------------------------------------------------
+# LLM response cache
+# ---------------------------------------------------------------------------
+
+def llm_cache_dir():
+    """Directory holding cached Gemini response envelopes."""
+    return Path(tempfile.gettempdir()) / "claude_insights_llm_cache"
+
+
+def clear_llm_cache():
+    """Delete the entire LLM response cache."""
+    shutil.rmtree(llm_cache_dir(), ignore_errors=True)
+
+
+def _llm_cache_path(prompt_bytes):
+    digest = hashlib.blake2b(prompt_bytes, digest_size=16).hexdigest()
+    return llm_cache_dir() / f"{digest}.json"
+
+
+def _llm_cache_get(cache_path):
+    """Return a cached envelope if present and within TTL, else None."""
+    try:
+        if time.time() - cache_path.stat().st_mtime > LLM_CACHE_TTL:
+            return None
+        return json.loads(cache_path.read_bytes())
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+def _llm_cache_put(cache_path, envelope):
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = cache_path.with_suffix(".json.tmp")
+        tmp_path.write_text(json.dumps(envelope, separators=(",", ":")))
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        pass  # cache writes are best-effort
 
 
 # ---------------------------------------------------------------------------
@@ -42,60 +175,119 @@ def check_gemini_cli():
         sys.exit(1)
 
 
-def call_gemini(prompt_text):
-    """Call Gemini CLI via temp file to avoid stdin pipe limits.
+async def call_gemini(prompt):
+    """Call Gemini CLI, feeding the prompt directly via stdin.
+
+    Accepts `str` or pre-encoded `bytes`; the subprocess runs in binary
+    mode so bytes prompts are piped through without re-encoding. The
+    subprocess is driven through asyncio, so one event loop can keep
+    dozens of calls in flight without burning a thread per call; while
+    waiting on the pipe the coroutine costs nothing.
 
     Returns:
         Tuple of (response_envelope, error_string).
         On success, error is None. On failure, envelope is None.
+
+    When the LLM_CACHE_ENV opt-in is set, identical prompts are served
+    from a disk cache keyed by prompt hash instead of re-hitting Gemini.
     """
-    tmp_dir = tempfile.gettempdir()
-    with tempfile.NamedTemporaryFile(
-        mode="w", suffix=".txt", delete=False, dir=tmp_dir,
-    ) as f:
-        f.write(prompt_text)
-        tmp_path = f.name
+    if isinstance(prompt, str):
+        prompt = prompt.encode("utf-8")
 
-    try:
-        with open(tmp_path, "r") as stdin_file:
-            result = subprocess.run(
-                ["gemini", "-m", "gemini-2.5-pro", "-p", "", "-o", "json"],
-                stdin=stdin_file,
-                capture_output=True,
-                text=True,
-                timeout=300,
-            )
+    cache_path = None
+    if os.environ.get(LLM_CACHE_ENV) == "1":
+        cache_path = _llm_cache_path(prompt)
+        envelope = _llm_cache_get(cache_path)
+        if envelope is not None:
+            return envelope, None
 
-        if result.returncode != 0:
-            stderr_snippet = (result.stderr[:500] if result.stderr
-                              else "(no stderr)")
-            return None, f"Exit code {result.returncode}: {stderr_snippet}"
+    if _rate_limiter is not None:
+        wait = _rate_limiter.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
 
-        stdout = result.stdout.strip()
+    try:
+        proc = await asyncio.create_subprocess_exec(
+            "gemini", "-m", "gemini-2.5-pro", "-p", "", "-o", "json",
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        try:
+            stdout, stderr = await asyncio.wait_for(
+                proc.communicate(prompt), timeout=300,
+            )
+        except asyncio.TimeoutError:
+            proc.kill()
+            await proc.wait()
+            return None, "Timeout (300s)"
+
+        if proc.returncode != 0:
+            stderr_text = stderr.decode("utf-8", errors="replace")
+            stderr_snippet = stderr_text[:500] if stderr_text else "(no stderr)"
+            return None, f"Exit code {proc.returncode}: {stderr_snippet}"
+
+        # Parse the envelope straight from bytes — skips a full UTF-8
+        # decode of the response into an intermediate str
+        stdout = stdout.strip()
         if not stdout:
             return None, "Empty stdout"
 
-        envelope = json.loads(stdout)
+        envelope = _loads(stdout)
+        if cache_path is not None:
+            _llm_cache_put(cache_path, envelope)
         return envelope, None
 
-    except subprocess.TimeoutExpired:
-        return None, "Timeout (300s)"
-    except json.JSONDecodeError as e:
+    except ValueError as e:  # json or orjson decode error
         return None, f"JSON parse error: {e}"
-    finally:
-        try:
-            os.unlink(tmp_path)
-        except OSError:
-            pass
 
 
 # ---------------------------------------------------------------------------
 # Phase 2: Batch processing
 # ---------------------------------------------------------------------------
 
-def make_batches(sessions_with_transcripts):
-    """Group sessions into batches respecting size and count limits."""
-    batches = []
+# Outcome of one batch: results is a list of (session_id, facet) tuples,
+# latency_ms is Gemini-reported API latency, error is None on success
+BatchResult = namedtuple(
+    "BatchResult", ["batch_idx", "n_sessions", "results", "latency_ms",
+                    "error"],
+)
+
+
+def _backoff_delay(attempt):
+    """Exponential backoff with jitter so parallel workers desynchronize."""
+    return (min(BACKOFF_BASE * 2 ** attempt, BACKOFF_CAP)
+            + random.uniform(0, BACKOFF_JITTER))
+
+
+async def _retry_after_failure(tag, attempt, message, verbose=False):
+    """Sleep with backoff if retries remain, logging when verbose.
+
+    Returns True when the caller should retry, False when exhausted.
+    """
+    if attempt >= MAX_RETRIES - 1:
+        return False
+    delay = _backoff_delay(attempt)
+    if verbose:
+        _log(
+            f"{tag} {message} — retrying in {delay:.0f}s "
+            f"(attempt {attempt + 2}/{MAX_RETRIES})"
+        )
+    await asyncio.sleep(delay)
+    return True
+
+
+def iter_batches(sessions_with_transcripts):
+    """Group sessions into batches respecting size and count limits.
+
+    Accepts any iterable and yields each batch as soon as it fills, so
+    a streaming producer can have the first batch dispatched to Gemini
+    while later transcripts are still being read off disk.
+
+    Yields:
+        (batch_items, batch_chars) tuples — the running size is tracked
+        here so callers never re-sum transcripts just to print it.
+    """
     current_batch = []
     current_chars = 0
 
@@ -104,16 +296,16 @@ def make_batches(sessions_with_transcripts):
 
         if item_chars > 200_000:
             if current_batch:
-                batches.append(current_batch)
+                yield current_batch, current_chars
                 current_batch = []
                 current_chars = 0
-            batches.append([item])
+            yield [item], item_chars
             continue
 
         if (len(current_batch) >= BATCH_SIZE
                 or current_chars + item_chars > BATCH_CHAR_LIMIT):
             if current_batch:
-                batches.append(current_batch)
+                yield current_batch, current_chars
             current_batch = [item]
             current_chars = item_chars
         else:
@@ -121,19 +313,39 @@ def make_batches(sessions_with_transcripts):
             current_chars += item_chars
 
     if current_batch:
-        batches.append(current_batch)
+        yield current_batch, current_chars
 
-    return batches
+
+def make_batches(sessions_with_transcripts):
+    """Materialize iter_batches into a list (used by --dry-run)."""
+    return list(iter_batches(sessions_with_transcripts))
 
 
 def build_batch_prompt(batch, facet_prompt):
-    """Assemble the prompt for a batch of sessions."""
-    parts = [facet_prompt, "\n\n"]
+    """Assemble the prompt for a batch of sessions as UTF-8 bytes.
+
+    A single bytearray grows geometrically, avoiding the intermediate
+    list-of-strings plus giant join that a str build would allocate.
+    `facet_prompt` and each transcript are already UTF-8 bytes, so the
+    batch is assembled without encoding anything but the boundary IDs.
+    """
+    buf = bytearray()
+    buf += facet_prompt
+    buf += b"\n\n"
     for item in batch:
-        parts.append(f"===SESSION_BOUNDARY::{item['session_id']}===\n")
-        parts.append(item["transcript"])
-        parts.append("\n\n")
-    return "".join(parts)
+        buf += b"===SESSION_BOUNDARY::"
+        buf += item["session_id"].encode("utf-8")
+        buf += b"===\n"
+        buf += item["transcript"]
+        buf += b"\n\n"
+    return bytes(buf)
+
+
+# Markdown code fences around Gemini's JSON output
+_FENCE_OPEN = re.compile(r"^```[^\n]*\n?")
+_FENCE_CLOSE = re.compile(r"\n?```\s*$")
+# Start of a candidate JSON object in free-form text
+_OBJ_START = re.compile(r"\{")
 
 
 def parse_facets_response(response_text, expected_count):
@@ -146,12 +358,9 @@ def parse_facets_response(response_text, expected_count):
 
     # Strip markdown code fences if present
     if text.startswith("```"):
-        lines = text.split("\n")
-        if lines[-1].strip() == "```":
-            lines = lines[1:-1]
-        else:
-            lines = lines[1:]
-        text = "\n".join(lines).strip()
+        text = _FENCE_OPEN.sub("", text, count=1)
+        text = _FENCE_CLOSE.sub("", text, count=1)
+        text = text.strip()
 
     try:
         parsed = json.loads(text)
@@ -162,93 +371,90 @@ def parse_facets_response(response_text, expected_count):
         else:
             return None, f"Unexpected type: {type(parsed)}"
     except json.JSONDecodeError:
-        # Fallback: extract individual JSON objects
+        # Fallback: extract individual JSON objects, letting the
+        # C-implemented decoder tokenize instead of scanning braces
+        # character-by-character in Python.
+        decoder = json.JSONDecoder()
         facets = []
-        depth = 0
-        start = None
-        for i, ch in enumerate(text):
-            if ch == "{":
-                if depth == 0:
-                    start = i
-                depth += 1
-            elif ch == "}":
-                depth -= 1
-                if depth == 0 and start is not None:
-                    try:
-                        obj = json.loads(text[start:i + 1])
-                        facets.append(obj)
-                    except json.JSONDecodeError:
-                        pass
-                    start = None
+        pos = 0
+        while True:
+            match = _OBJ_START.search(text, pos)
+            if match is None:
+                break
+            try:
+                obj, end = decoder.raw_decode(text, match.start())
+            except json.JSONDecodeError:
+                pos = match.start() + 1
+                continue
+            facets.append(obj)
+            pos = end
 
         if facets:
             return facets, None
         return None, "Could not parse any JSON objects from response"
 
 
-def process_batch(batch, facet_prompt, batch_idx, total_batches, verbose=False):
+async def process_batch(batch, batch_chars, facet_prompt, batch_idx,
+                        total_batches, facets_dir, verbose=False):
     """Process a single batch through Gemini.
 
+    Each facet is saved to `facets_dir` the moment it is matched, so
+    partial progress survives a crash or Ctrl-C mid-run. Progress is
+    reported through the returned BatchResult — the caller logs one
+    line per batch — with mid-flight retry detail only under verbose.
+
     Returns:
-        List of (session_id, facet) tuples.
+        A BatchResult.
     """
-    batch_chars = sum(len(item["transcript"]) for item in batch)
     n = len(batch)
-    print(
-        f"  [Batch {batch_idx}/{total_batches}] "
-        f"Processing {n} sessions ({batch_chars // 1000}K chars)...",
-        end="", flush=True,
-    )
+    # total_batches is None when batches are streamed and the total is
+    # not yet known
+    if total_batches is None:
+        tag = f"  [Batch {batch_idx}]"
+    else:
+        tag = f"  [Batch {batch_idx}/{total_batches}]"
+    if verbose:
+        _log(f"{tag} Processing {n} sessions ({batch_chars // 1000}K chars)...")
 
     prompt = build_batch_prompt(batch, facet_prompt)
     session_ids = [item["session_id"] for item in batch]
     session_map = {item["session_id"]: item for item in batch}
 
     for attempt in range(MAX_RETRIES):
-        envelope, error = call_gemini(prompt)
+        envelope, error = await call_gemini(prompt)
         if error:
-            wait = RETRY_BACKOFF[min(attempt, len(RETRY_BACKOFF) - 1)]
-            print(f" error: {error}", flush=True)
-            if attempt < MAX_RETRIES - 1:
-                print(
-                    f"    Retrying in {wait}s "
-                    f"(attempt {attempt + 2}/{MAX_RETRIES})...",
-                    end="", flush=True,
-                )
-                time.sleep(wait)
+            if await _retry_after_failure(tag, attempt, f"error: {error}",
+                                          verbose=verbose):
                 continue
-            print(f"    FAILED after {MAX_RETRIES} attempts", flush=True)
-            return []
+            return BatchResult(
+                batch_idx, n, [], 0,
+                f"{error} (after {MAX_RETRIES} attempts)",
+            )
 
         response_text = envelope.get("response", "")
         facets, parse_error = parse_facets_response(response_text, n)
 
         if parse_error:
-            print(f" parse error: {parse_error}", flush=True)
-            if attempt < MAX_RETRIES - 1:
-                wait = RETRY_BACKOFF[min(attempt, len(RETRY_BACKOFF) - 1)]
-                print(f"    Retrying in {wait}s...", end="", flush=True)
-                time.sleep(wait)
+            if await _retry_after_failure(tag, attempt,
+                                          f"parse error: {parse_error}",
+                                          verbose=verbose):
                 continue
-            print(
-                f"    FAILED to parse after {MAX_RETRIES} attempts",
-                flush=True,
+            return BatchResult(
+                batch_idx, n, [], 0,
+                f"parse error: {parse_error} (after {MAX_RETRIES} attempts)",
             )
-            return []
 
         if len(facets) != n:
-            print(
-                f" count mismatch: got {len(facets)}, expected {n}",
-                flush=True,
-            )
-            if attempt < MAX_RETRIES - 1:
-                wait = RETRY_BACKOFF[min(attempt, len(RETRY_BACKOFF) - 1)]
-                print(f"    Retrying in {wait}s...", end="", flush=True)
-                time.sleep(wait)
+            if await _retry_after_failure(
+                    tag, attempt,
+                    f"count mismatch: got {len(facets)}, expected {n}",
+                    verbose=verbose):
                 continue
-            print(
-                f"    Using {len(facets)} of {n} (partial)", flush=True,
-            )
+            if verbose:
+                _log(
+                    f"{tag} count mismatch: "
+                    f"using {len(facets)} of {n} (partial)"
+                )
 
         # Match facets to sessions
         results = []
@@ -260,41 +466,83 @@ def process_batch(batch, facet_prompt, batch_idx, total_batches, verbose=False):
                 facet["project"] = item["project"]
                 facet["start_timestamp"] = item.get("start_ts")
                 facet["end_timestamp"] = item.get("end_ts")
+                # Pre-parsed epoch so loads/filters skip ISO parsing
+                start_epoch = iso_to_epoch(item.get("start_ts"))
+                if start_epoch is not None:
+                    facet["start_epoch"] = start_epoch
                 facet["_source_mtime"] = item["mtime"]
+                save_facet(fid, facet, facets_dir)
                 results.append((fid, facet))
                 matched_ids.add(fid)
 
         unmatched = set(session_ids) - matched_ids
         if unmatched and verbose:
-            print(f"    Unmatched session IDs: {unmatched}", flush=True)
+            _log(f"{tag} Unmatched session IDs: {unmatched}")
 
-        elapsed = (
+        latency_ms = (
             envelope.get("stats", {})
             .get("models", {})
             .get("gemini-2.5-pro", {})
             .get("api", {})
             .get("totalLatencyMs", 0)
         )
-        print(f" done ({elapsed // 1000}s, {len(results)} facets)", flush=True)
-        return results
+        return BatchResult(batch_idx, n, results, latency_ms, None)
 
-    return []
+    return BatchResult(batch_idx, n, [], 0, "retries exhausted")
 
 
 def save_facet(session_id, facet, facets_dir):
-    """Save a facet to the cache directory."""
+    """Save a facet to the cache directory atomically.
+
+    Facets are machine-read only, so they are stored compact (no
+    indentation, raw UTF-8) — fewer bytes to write now and to parse
+    back on every report run.
+    """
     facets_dir = Path(facets_dir)
     facets_dir.mkdir(parents=True, exist_ok=True)
     facet_path = facets_dir / f"{session_id}.json"
-    facet_path.write_text(json.dumps(facet, indent=2))
+    tmp_path = facets_dir / f"{session_id}.json.tmp"
+    data = json.dumps(facet, separators=(",", ":"), ensure_ascii=False)
+    tmp_path.write_bytes(data.encode("utf-8"))
+    os.replace(tmp_path, facet_path)
+    # Keep the SQLite index in lockstep with the file, so a crash
+    # mid-run never hides already-saved facets from cache checks
+    upsert_facet_db(facets_dir, facet)
 
 
 # ---------------------------------------------------------------------------
 # Phase 3: Report generation
 # ---------------------------------------------------------------------------
 
+# Facet fields forwarded to the report prompt, in output order
+_REPORT_KEYS = (
+    "session_id",
+    "project",
+    "underlying_goal",
+    "outcome",
+    "claude_helpfulness",
+    "session_type",
+    "goal_categories",
+    "friction_counts",
+    "friction_detail",
+    "primary_success",
+    "improvement_opportunity",
+    "start_timestamp",
+    "end_timestamp",
+)
+
+
+def _compact_facet(facet):
+    """Project a facet onto the report keys, dropping empty values."""
+    compact = {}
+    for key in _REPORT_KEYS:
+        if (value := facet.get(key)):
+            compact[key] = value
+    return compact
+
+
 def generate_report(facets, prompts_dir, output_dir, verbose=False,
-                    project_slug=None):
+                    project_slug=None, stats=None):
     """Generate HTML report by feeding stats + facets to Gemini.
 
     Args:
@@ -303,14 +551,17 @@ def generate_report(facets, prompts_dir, output_dir, verbose=False,
         output_dir: Path to the output directory.
         verbose: Enable verbose output.
         project_slug: If set, tailor report to this project.
+        stats: Precomputed aggregate stats (e.g. from the SQLite index);
+            computed from `facets` when None.
 
     Returns:
         Path to the generated report, or None on error.
     """
-    stats = compute_aggregate_stats(facets)
+    if stats is None:
+        stats = compute_aggregate_stats(facets)
     temporal = compute_temporal_stats(facets)
 
-    report_prompt = (Path(prompts_dir) / "report_prompt.txt").read_text()
+    report_prompt = read_prompt(Path(prompts_dir) / "report_prompt.txt")
 
     if project_slug:
         report_prompt += (
@@ -320,36 +571,17 @@ def generate_report(facets, prompts_dir, output_dir, verbose=False,
         )
 
     # Build compact facet summaries
-    compact_facets = []
-    for f in facets:
-        summary = {
-            "session_id": f.get("session_id"),
-            "project": f.get("project"),
-            "underlying_goal": f.get("underlying_goal"),
-            "outcome": f.get("outcome"),
-            "claude_helpfulness": f.get("claude_helpfulness"),
-            "session_type": f.get("session_type"),
-            "goal_categories": f.get("goal_categories"),
-            "friction_counts": f.get("friction_counts"),
-            "friction_detail": f.get("friction_detail"),
-            "primary_success": f.get("primary_success"),
-            "improvement_opportunity": f.get("improvement_opportunity", ""),
-            "start_timestamp": f.get("start_timestamp"),
-            "end_timestamp": f.get("end_timestamp"),
-        }
-        compact_facets.append(
-            {k: v for k, v in summary.items() if v}
-        )
+    compact_facets = [_compact_facet(f) for f in facets]
 
     input_text = (
         f"{report_prompt}\n\n"
         f"## AGGREGATE STATS\n```json\n"
-        f"{json.dumps(stats, indent=2)}\n```\n\n"
+        f"{_dumps(stats, indent=True)}\n```\n\n"
         f"## TEMPORAL DATA\n```json\n"
-        f"{json.dumps(temporal, indent=2)}\n```\n\n"
+        f"{_dumps(temporal, indent=True)}\n```\n\n"
         f"## ALL FACETS ({len(compact_facets)} sessions)\n"
         f"```json\n"
-        f"{json.dumps(compact_facets, separators=(',', ':'))}\n```\n"
+        f"{_dumps(compact_facets)}\n```\n"
     )
 
     input_chars = len(input_text)
@@ -358,7 +590,7 @@ def generate_report(facets, prompts_dir, output_dir, verbose=False,
         flush=True,
     )
 
-    envelope, error = call_gemini(input_text)
+    envelope, error = asyncio.run(call_gemini(input_text))
     if error:
         print(f"Error generating report: {error}", file=sys.stderr)
         return None
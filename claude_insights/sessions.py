@@ -1,12 +1,30 @@
 """Data layer — discover, clean, filter, load, and aggregate session data."""
 
+import heapq
 import json
+import os
+import sqlite3
 import sys
 import time
-from collections import defaultdict
-from datetime import datetime, timedelta, timezone
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timezone
+from functools import lru_cache
 from pathlib import Path
 
+try:  # optional accelerator for JSON-heavy paths
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _loads(data):
+    """Parse JSON from bytes or str, via orjson when it is installed."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
 # ---------------------------------------------------------------------------
 # Noise types to skip when cleaning transcripts
 # ---------------------------------------------------------------------------
@@ -14,6 +32,14 @@ NOISE_TYPES = frozenset({
     "progress", "file-history-snapshot", "system", "queue-operation",
 })
 
+# Raw-bytes fingerprints of the noise types, matching the canonical
+# compact serialization Claude Code writes. Lines containing one are
+# dropped before JSON parsing; anything serialized differently still
+# falls through to the NOISE_TYPES check after parsing.
+NOISE_PATTERNS = tuple(
+    f'"type":"{t}"'.encode("utf-8") for t in NOISE_TYPES
+)
+
 
 # ---------------------------------------------------------------------------
 # Phase 1: Discover & Clean
@@ -30,73 +56,130 @@ def discover_sessions(sessions_dir, project_filter=None, since_days=None,
         limit: Maximum number of sessions to return (newest first).
 
     Returns:
-        List of session dicts sorted by mtime descending.
+        Tuple of (session dicts sorted by mtime descending, number of
+        distinct projects among them).
     """
     sessions = []
+    seen_projects = set()
     sessions_dir = Path(sessions_dir)
 
     if not sessions_dir.exists():
         print(f"Error: {sessions_dir} not found", file=sys.stderr)
         sys.exit(1)
 
-    for project_dir in sorted(sessions_dir.iterdir()):
-        if not project_dir.is_dir():
+    cutoff = None
+    if since_days is not None:
+        cutoff = time.time() - (since_days * 86400)
+
+    # Directory order doesn't matter here: the only ordering callers see
+    # is the mtime sort at the end
+    with os.scandir(sessions_dir) as it:
+        project_entries = list(it)
+
+    for project_entry in project_entries:
+        if not project_entry.is_dir():
             continue
-        project_name = project_dir.name
+        project_name = project_entry.name
 
         if project_filter and project_filter not in project_name:
             continue
+        # Subagent session dirs are siblings of project dirs — skip them
+        # here rather than substring-matching every file's full path
+        if "subagents" in project_name:
+            continue
 
-        for jsonl in sorted(project_dir.glob("*.jsonl")):
-            if "subagents" in str(jsonl):
+        with os.scandir(project_entry.path) as it:
+            file_entries = list(it)
+
+        for entry in file_entries:
+            if not entry.name.endswith(".jsonl"):
+                continue
+            if "subagents" in entry.name:
                 continue
 
-            stat = jsonl.stat()
-            mtime = stat.st_mtime
+            # scandir entries cache the stat from the directory walk, so
+            # this is one syscall at most instead of one per attribute
+            stat = entry.stat()
             size = stat.st_size
-
             if size < 100:
                 continue
 
-            if since_days is not None:
-                cutoff = time.time() - (since_days * 86400)
-                if mtime < cutoff:
-                    continue
+            mtime = stat.st_mtime
+            if cutoff is not None and mtime < cutoff:
+                continue
 
             sessions.append({
-                "session_id": jsonl.stem,
+                "session_id": entry.name[:-len(".jsonl")],
                 "project": project_name,
-                "path": jsonl,
+                "path": Path(entry.path),
                 "mtime": mtime,
                 "size": size,
             })
+            seen_projects.add(project_name)
 
-    sessions.sort(key=lambda s: s["mtime"], reverse=True)
+    if limit and len(sessions) > limit:
+        # nlargest returns the top-N already sorted newest-first, in
+        # O(n log limit) instead of sorting everything
+        sessions = heapq.nlargest(limit, sessions, key=lambda s: s["mtime"])
+        seen_projects = {s["project"] for s in sessions}
+    else:
+        sessions.sort(key=lambda s: s["mtime"], reverse=True)
 
-    if limit:
-        sessions = sessions[:limit]
+    return sessions, len(seen_projects)
 
-    return sessions
+
+# Per-message cap for transcript text
+_TRUNCATE_LIMIT = 20_000
+
+
+def _clip(text):
+    """Strip message text and cap it at the truncation limit.
+
+    Multi-hundred-KB tool outputs are common, so oversized strings are
+    pre-sliced before strip() to avoid copying megabytes just to throw
+    almost all of them away.
+    """
+    if len(text) > _TRUNCATE_LIMIT * 2:
+        text = text[:_TRUNCATE_LIMIT * 2]
+    text = text.strip()
+    if len(text) > _TRUNCATE_LIMIT:
+        text = text[:_TRUNCATE_LIMIT] + "\n[...truncated...]"
+    return text
 
 
 def clean_transcript(jsonl_path):
     """Extract clean text from a session JSONL.
 
+    The transcript is returned as UTF-8 bytes so it can flow into the
+    batch prompt and the Gemini subprocess without being re-encoded.
+
     Returns:
-        Tuple of (transcript_text, start_timestamp, end_timestamp).
+        Tuple of (transcript_bytes, start_timestamp, end_timestamp).
     """
-    lines = []
-    timestamps = []
+    # One growing buffer instead of a list of strings plus a final join
+    # halves peak memory on long sessions
+    buf = bytearray()
+    # ISO-8601 strings compare lexicographically in chronological order,
+    # so min/max can be tracked in one pass without keeping them all
+    start_ts = None
+    end_ts = None
     errors = 0
 
-    with open(jsonl_path, "r") as f:
+    # Stream lines through a large buffer instead of slurping the
+    # whole file: peak memory stays at one line even for multi-MB
+    # sessions, and parsing starts before the last byte is read
+    with open(jsonl_path, "rb", buffering=1 << 20) as f:
         for raw_line in f:
             raw_line = raw_line.strip()
             if not raw_line:
                 continue
+            # Cheap substring test skips noise lines (progress entries can
+            # dominate a session) without paying for a JSON parse
+            if any(p in raw_line for p in NOISE_PATTERNS):
+                continue
             try:
-                entry = json.loads(raw_line)
-            except json.JSONDecodeError:
+                entry = _loads(raw_line)
+            except ValueError:  # json or orjson decode error
                 errors += 1
                 continue
 
@@ -107,41 +190,190 @@ def clean_transcript(jsonl_path):
 
             ts = entry.get("timestamp")
             if ts:
-                timestamps.append(ts)
+                if start_ts is None or ts < start_ts:
+                    start_ts = ts
+                if end_ts is None or ts > end_ts:
+                    end_ts = ts
 
             if entry_type == "summary":
                 summary = entry.get("summary", "")
                 if summary:
-                    lines.append(f"[SUMMARY] {summary}")
+                    buf += b"[SUMMARY] "
+                    buf += summary.encode("utf-8")
+                    buf += b"\n"
                 continue
 
             if entry_type in ("user", "assistant"):
                 msg = entry.get("message", {})
                 content = msg.get("content", "")
                 role = msg.get("role", entry_type)
-
-                if isinstance(content, str) and content.strip():
-                    text = content.strip()
-                    if len(text) > 20_000:
-                        text = text[:20_000] + "\n[...truncated...]"
-                    lines.append(f"[{role.upper()}] {text}")
+                prefix = f"[{role.upper()}] ".encode("utf-8")
+
+                if isinstance(content, str):
+                    text = _clip(content)
+                    if text:
+                        buf += prefix
+                        buf += text.encode("utf-8")
+                        buf += b"\n"
                 elif isinstance(content, list):
                     for part in content:
                         if isinstance(part, dict) and part.get("type") == "text":
-                            text = part.get("text", "").strip()
+                            text = _clip(part.get("text", ""))
                             if text:
-                                if len(text) > 20_000:
-                                    text = text[:20_000] + "\n[...truncated...]"
-                                lines.append(f"[{role.upper()}] {text}")
+                                buf += prefix
+                                buf += text.encode("utf-8")
+                                buf += b"\n"
+
+    if errors > 0 and not buf:
+        return b"", start_ts, end_ts
+
+    # Drop the trailing newline to match the old join() output
+    return bytes(buf[:-1]), start_ts, end_ts
+
+
+def clean_transcripts_parallel(paths, workers=None):
+    """Clean many session JSONLs, fanning out across CPU cores.
+
+    Cleaning is CPU-bound on JSON parsing and each file is independent,
+    so a process pool scales close to linearly. Results are yielded in
+    input order as (transcript_bytes, start_ts, end_ts) tuples; small
+    workloads fall back to a plain serial loop.
+    """
+    paths = list(paths)
+    if workers is None:
+        workers = min(os.cpu_count() or 1, len(paths))
+
+    if workers <= 1 or len(paths) < 2:
+        for path in paths:
+            yield clean_transcript(path)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(clean_transcript, paths, chunksize=8)
+
+
+# SQLite index over the facet JSONs so cache checks, loads, and
+# aggregations don't open every file. The JSON files stay the
+# user-visible source of truth; deleting the DB forces a rebuild on the
+# next extraction run.
+DB_NAME = "_facets.db"
+
+_DB_SCHEMA = """
+CREATE TABLE IF NOT EXISTS facets (
+    session_id TEXT PRIMARY KEY,
+    project TEXT,
+    start_epoch REAL,
+    mtime REAL,
+    outcome TEXT,
+    helpfulness TEXT,
+    session_type TEXT,
+    friction_count INTEGER,
+    blob BLOB
+);
+CREATE INDEX IF NOT EXISTS facets_project ON facets(project);
+CREATE INDEX IF NOT EXISTS facets_start_epoch ON facets(start_epoch);
+"""
+
+
+def _connect_db(facets_dir):
+    """Open (creating if needed) the facets index DB."""
+    conn = sqlite3.connect(Path(facets_dir) / DB_NAME)
+    conn.executescript(_DB_SCHEMA)
+    return conn
+
+
+def _facet_blob(facet):
+    """Serialize a facet to compact JSON bytes for the blob column."""
+    if orjson is not None:
+        return orjson.dumps(facet)
+    return json.dumps(
+        facet, separators=(",", ":"), ensure_ascii=False,
+    ).encode("utf-8")
+
+
+def _facet_row(facet):
+    """Build the facets-table row tuple for one facet dict."""
+    epoch = facet.get("start_epoch")
+    if epoch is None:
+        epoch = iso_to_epoch(facet.get("start_timestamp"))
+    friction = facet.get("friction_counts", {})
+    return (
+        facet.get("session_id", ""),
+        facet.get("project", ""),
+        epoch,
+        facet.get("_source_mtime", 0),
+        facet.get("outcome", "unclear"),
+        facet.get("claude_helpfulness", "unknown"),
+        facet.get("session_type", "unknown"),
+        sum(friction.values()) if friction else 0,
+        _facet_blob(facet),
+    )
+
+
+def _scan_facet_files(facets_dir):
+    """Yield every parseable facet JSON in the directory, unfiltered."""
+    with os.scandir(facets_dir) as entries:
+        names = [
+            e.name for e in entries
+            if e.name.endswith(".json") and not e.name.startswith("_")
+        ]
+    for name in names:
+        try:
+            yield _loads((facets_dir / name).read_bytes())
+        except (OSError, ValueError):
+            continue
 
-    transcript = "\n".join(lines)
-    start_ts = min(timestamps) if timestamps else None
-    end_ts = max(timestamps) if timestamps else None
 
-    if errors > 0 and len(lines) == 0:
-        return "", start_ts, end_ts
+def upsert_facet_db(facets_dir, facet):
+    """Mirror one freshly saved facet into the index, if it exists.
 
-    return transcript, start_ts, end_ts
+    Called at facet-write time so the index never lags the JSON files:
+    a crash or Ctrl-C mid-run leaves every already-saved facet visible
+    to cache checks and loads. Before the index is bootstrapped this is
+    a no-op — the file-scan fallbacks cover that case.
+    """
+    facets_dir = Path(facets_dir)
+    if not (facets_dir / DB_NAME).exists():
+        return
+
+    conn = _connect_db(facets_dir)
+    try:
+        conn.execute(
+            "INSERT OR REPLACE INTO facets VALUES (?,?,?,?,?,?,?,?,?)",
+            _facet_row(facet),
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def update_facets_db(facets_dir, new_facets):
+    """Upsert facets into the SQLite index, bootstrapping it if absent.
+
+    The first call on a cache that predates the index loads every facet
+    JSON once; after that only new or changed facets are written.
+    """
+    facets_dir = Path(facets_dir)
+    if not facets_dir.exists():
+        return
+
+    bootstrap = not (facets_dir / DB_NAME).exists()
+    conn = _connect_db(facets_dir)
+    try:
+        rows = [_facet_row(f) for f in new_facets]
+        if bootstrap:
+            fresh_ids = {row[0] for row in rows}
+            rows.extend(
+                _facet_row(f) for f in _scan_facet_files(facets_dir)
+                if f.get("session_id") not in fresh_ids
+            )
+        conn.executemany(
+            "INSERT OR REPLACE INTO facets VALUES (?,?,?,?,?,?,?,?,?)",
+            rows,
+        )
+        conn.commit()
+    finally:
+        conn.close()
 
 
 def filter_cached(sessions, facets_dir, force=False):
@@ -159,6 +391,19 @@ def filter_cached(sessions, facets_dir, force=False):
         return sessions
 
     facets_dir = Path(facets_dir)
+
+    if (facets_dir / DB_NAME).exists():
+        conn = _connect_db(facets_dir)
+        try:
+            cached = dict(conn.execute("SELECT session_id, mtime FROM facets"))
+        finally:
+            conn.close()
+        return [
+            s for s in sessions
+            if cached.get(s["session_id"]) != s["mtime"]
+        ]
+
+    # No index yet — fall back to reading each facet's recorded mtime
     to_process = []
     for s in sessions:
         facet_path = facets_dir / f"{s['session_id']}.json"
@@ -179,13 +424,27 @@ def filter_cached(sessions, facets_dir, force=False):
 # Phase 3: Load & Aggregate
 # ---------------------------------------------------------------------------
 
-def load_all_facets(facets_dir, project_filter=None, since_days=None):
+def iso_to_epoch(ts):
+    """Parse an ISO-8601 timestamp string to a Unix epoch, or None."""
+    if not ts:
+        return None
+    try:
+        return datetime.fromisoformat(ts.replace("Z", "+00:00")).timestamp()
+    except (ValueError, TypeError):
+        return None
+
+
+def load_all_facets(facets_dir, project_filter=None, since_days=None,
+                    skip_ids=None, session_ids=None):
     """Load all cached facets, optionally filtered.
 
     Args:
         facets_dir: Path to the facets cache directory.
         project_filter: Substring filter on facet project name.
         since_days: Only include facets with start_timestamp within N days.
+        skip_ids: Session IDs to skip (e.g. facets already in memory).
+        session_ids: If given, open exactly these facets directly instead
+            of enumerating the directory (no readdir, no per-file stat).
 
     Returns:
         List of facet dicts.
@@ -195,35 +454,178 @@ def load_all_facets(facets_dir, project_filter=None, since_days=None):
     if not facets_dir.exists():
         return facets
 
-    cutoff_dt = None
+    cutoff_epoch = None
     if since_days is not None:
-        cutoff_dt = datetime.now(timezone.utc) - timedelta(days=since_days)
+        cutoff_epoch = time.time() - (since_days * 86400)
+
+    if (facets_dir / DB_NAME).exists():
+        return _load_facets_db(
+            facets_dir, project_filter, cutoff_epoch, skip_ids, session_ids,
+        )
+
+    if session_ids is not None:
+        names = sorted(f"{sid}.json" for sid in session_ids)
+    else:
+        with os.scandir(facets_dir) as entries:
+            names = sorted(
+                e.name for e in entries
+                if e.name.endswith(".json") and not e.name.startswith("_")
+            )
+
+    if skip_ids:
+        names = [n for n in names if n[:-len(".json")] not in skip_ids]
 
-    for fp in sorted(facets_dir.glob("*.json")):
+    def load_one(name):
         try:
-            facet = json.loads(fp.read_text())
-        except (json.JSONDecodeError, OSError):
+            return _loads((facets_dir / name).read_bytes())
+        except (ValueError, OSError):
+            return None
+
+    # Thread the reads: each is a small independent file, so a handful
+    # of workers overlaps I/O waits; map preserves input order
+    if len(names) > 1:
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            loaded = list(executor.map(load_one, names))
+    else:
+        loaded = [load_one(n) for n in names]
+
+    for facet in loaded:
+        if facet is None:
             continue
 
         if project_filter and project_filter not in facet.get("project", ""):
             continue
 
-        if cutoff_dt:
-            ts = facet.get("start_timestamp")
-            if ts:
-                try:
-                    facet_dt = datetime.fromisoformat(
-                        ts.replace("Z", "+00:00")
-                    )
-                    if facet_dt < cutoff_dt:
-                        continue
-                except (ValueError, TypeError):
-                    pass  # keep facets with unparseable timestamps
+        if cutoff_epoch is not None:
+            # Facets written since start_epoch was added carry a float;
+            # older ones fall back to parsing the ISO string
+            epoch = facet.get("start_epoch")
+            if epoch is None:
+                epoch = iso_to_epoch(facet.get("start_timestamp"))
+            if epoch is not None and epoch < cutoff_epoch:
+                continue  # keep facets with no parseable timestamp
 
         facets.append(facet)
     return facets
 
 
+def _load_facets_db(facets_dir, project_filter, cutoff_epoch, skip_ids,
+                    session_ids):
+    """Query the SQLite index instead of opening facet files."""
+    query = "SELECT session_id, blob FROM facets"
+    clauses = []
+    params = []
+    if project_filter:
+        clauses.append("instr(project, ?) > 0")
+        params.append(project_filter)
+    if cutoff_epoch is not None:
+        # NULL start_epoch means no parseable timestamp — keep those,
+        # matching the file-scan path
+        clauses.append("(start_epoch IS NULL OR start_epoch >= ?)")
+        params.append(cutoff_epoch)
+    if clauses:
+        query += " WHERE " + " AND ".join(clauses)
+    query += " ORDER BY session_id"
+
+    conn = _connect_db(facets_dir)
+    try:
+        facets = []
+        for sid, blob in conn.execute(query, params):
+            if skip_ids and sid in skip_ids:
+                continue
+            if session_ids is not None and sid not in session_ids:
+                continue
+            facets.append(_loads(blob))
+        return facets
+    finally:
+        conn.close()
+
+
+def compute_aggregate_stats_db(facets_dir, project_filter=None,
+                               since_days=None):
+    """Compute aggregate stats with SQL GROUP BY, or None without a DB.
+
+    Produces the same dict shape as compute_aggregate_stats, but the
+    tallying runs inside SQLite (including the nested goal_categories /
+    friction_counts maps, via json_each over the stored blob) instead
+    of a Python loop over every facet.
+    """
+    facets_dir = Path(facets_dir)
+    if not (facets_dir / DB_NAME).exists():
+        return None
+
+    where = ""
+    clauses = []
+    params = []
+    if project_filter:
+        clauses.append("instr(project, ?) > 0")
+        params.append(project_filter)
+    if since_days is not None:
+        clauses.append("(start_epoch IS NULL OR start_epoch >= ?)")
+        params.append(time.time() - (since_days * 86400))
+    if clauses:
+        where = " WHERE " + " AND ".join(clauses)
+    params = tuple(params)
+
+    conn = _connect_db(facets_dir)
+    try:
+        def group_by(column):
+            return dict(conn.execute(
+                f"SELECT {column}, COUNT(*) FROM facets{where}"
+                f" GROUP BY {column}", params,
+            ))
+
+        def sum_json_map(path):
+            return dict(conn.execute(
+                f"SELECT key, SUM(value) FROM facets,"
+                f" json_each(facets.blob, ?){where} GROUP BY key",
+                (path,) + params,
+            ))
+
+        stats = {
+            "total_sessions": conn.execute(
+                f"SELECT COUNT(*) FROM facets{where}", params,
+            ).fetchone()[0],
+            "goal_categories": sum_json_map("$.goal_categories"),
+            "outcomes": group_by("outcome"),
+            "helpfulness": group_by("helpfulness"),
+            "session_types": group_by("session_type"),
+            "friction_types": sum_json_map("$.friction_counts"),
+            "sessions_with_friction": conn.execute(
+                f"SELECT COALESCE(SUM(friction_count > 0), 0)"
+                f" FROM facets{where}", params,
+            ).fetchone()[0],
+            "projects": {},
+        }
+
+        projects = stats["projects"]
+        for proj, count, friction in conn.execute(
+            f"SELECT project, COUNT(*), COALESCE(SUM(friction_count > 0), 0)"
+            f" FROM facets{where} GROUP BY project", params,
+        ):
+            projects[proj] = {
+                "count": count,
+                "outcomes": {},
+                "goal_categories": {},
+                "friction_count": friction,
+            }
+        for proj, outcome, count in conn.execute(
+            f"SELECT project, outcome, COUNT(*) FROM facets{where}"
+            f" GROUP BY project, outcome", params,
+        ):
+            projects[proj]["outcomes"][outcome] = count
+        for proj, cat, total in conn.execute(
+            f"SELECT project, key, SUM(value) FROM facets,"
+            f" json_each(facets.blob, '$.goal_categories'){where}"
+            f" GROUP BY project, key", params,
+        ):
+            projects[proj]["goal_categories"][cat] = total
+
+        return stats
+    finally:
+        conn.close()
+
+
 def compute_aggregate_stats(facets):
     """Compute aggregate statistics from all facets.
 
@@ -231,59 +633,58 @@ def compute_aggregate_stats(facets):
         Dict with total_sessions, goal_categories, outcomes, helpfulness,
         session_types, friction_types, sessions_with_friction, projects.
     """
-    stats = {
-        "total_sessions": len(facets),
-        "goal_categories": {},
-        "outcomes": {},
-        "helpfulness": {},
-        "session_types": {},
-        "friction_types": {},
-        "sessions_with_friction": 0,
-        "projects": {},
-    }
+    goal_categories = Counter()
+    outcomes = Counter()
+    helpfulness = Counter()
+    session_types = Counter()
+    friction_types = Counter()
+    sessions_with_friction = 0
+    projects = {}
 
     for f in facets:
-        for cat, count in f.get("goal_categories", {}).items():
-            stats["goal_categories"][cat] = (
-                stats["goal_categories"].get(cat, 0) + count
-            )
+        cats = f.get("goal_categories", {})
+        goal_categories.update(cats)
 
         outcome = f.get("outcome", "unclear")
-        stats["outcomes"][outcome] = stats["outcomes"].get(outcome, 0) + 1
-
-        h = f.get("claude_helpfulness", "unknown")
-        stats["helpfulness"][h] = stats["helpfulness"].get(h, 0) + 1
-
-        st = f.get("session_type", "unknown")
-        stats["session_types"][st] = stats["session_types"].get(st, 0) + 1
+        outcomes[outcome] += 1
+        helpfulness[f.get("claude_helpfulness", "unknown")] += 1
+        session_types[f.get("session_type", "unknown")] += 1
 
         friction = f.get("friction_counts", {})
         if friction:
-            stats["sessions_with_friction"] += 1
-        for ft, count in friction.items():
-            stats["friction_types"][ft] = (
-                stats["friction_types"].get(ft, 0) + count
-            )
+            sessions_with_friction += 1
+        friction_types.update(friction)
 
         proj = f.get("project", "unknown")
-        if proj not in stats["projects"]:
-            stats["projects"][proj] = {
+        ps = projects.get(proj)
+        if ps is None:
+            ps = projects[proj] = {
                 "count": 0,
-                "outcomes": {},
-                "goal_categories": {},
+                "outcomes": Counter(),
+                "goal_categories": Counter(),
                 "friction_count": 0,
             }
-        ps = stats["projects"][proj]
         ps["count"] += 1
-        ps["outcomes"][outcome] = ps["outcomes"].get(outcome, 0) + 1
-        for cat, count in f.get("goal_categories", {}).items():
-            ps["goal_categories"][cat] = (
-                ps["goal_categories"].get(cat, 0) + count
-            )
+        ps["outcomes"][outcome] += 1
+        ps["goal_categories"].update(cats)
         if friction:
             ps["friction_count"] += 1
 
-    return stats
+    # Plain dicts downstream (JSON-serialized into the report prompt)
+    for ps in projects.values():
+        ps["outcomes"] = dict(ps["outcomes"])
+        ps["goal_categories"] = dict(ps["goal_categories"])
+
+    return {
+        "total_sessions": len(facets),
+        "goal_categories": dict(goal_categories),
+        "outcomes": dict(outcomes),
+        "helpfulness": dict(helpfulness),
+        "session_types": dict(session_types),
+        "friction_types": dict(friction_types),
+        "sessions_with_friction": sessions_with_friction,
+        "projects": projects,
+    }
 
 
 def compute_temporal_stats(facets):
@@ -293,30 +694,35 @@ def compute_temporal_stats(facets):
         List of dicts with keys: week, count, success_rate, active_projects.
         Sorted chronologically.
     """
-    weekly = defaultdict(lambda: {
-        "count": 0, "fully_achieved": 0, "projects": set(),
-    })
+    weekly = {}
 
     for f in facets:
-        ts = f.get("start_timestamp")
-        if not ts:
-            continue
-        try:
-            dt = datetime.fromisoformat(ts.replace("Z", "+00:00"))
-        except (ValueError, TypeError):
+        epoch = f.get("start_epoch")
+        if epoch is None:
+            epoch = iso_to_epoch(f.get("start_timestamp"))
+        if epoch is None:
             continue
-
-        week_key = dt.strftime("%G-W%V")
-        weekly[week_key]["count"] += 1
+        dt = datetime.fromtimestamp(epoch, timezone.utc)
+
+        # Key on the (ISO year, ISO week) tuple — strftime is far more
+        # expensive and the label is only needed once per distinct week
+        iso = dt.isocalendar()
+        week_key = (iso[0], iso[1])
+        bucket = weekly.get(week_key)
+        if bucket is None:
+            bucket = weekly[week_key] = {
+                "count": 0, "fully_achieved": 0, "projects": set(),
+            }
+        bucket["count"] += 1
         if f.get("outcome") == "fully_achieved":
-            weekly[week_key]["fully_achieved"] += 1
-        weekly[week_key]["projects"].add(f.get("project", "unknown"))
+            bucket["fully_achieved"] += 1
+        bucket["projects"].add(f.get("project", "unknown"))
 
     result = []
-    for k, v in sorted(weekly.items()):
+    for (year, week), v in sorted(weekly.items()):
         success_rate = round(v["fully_achieved"] / v["count"] * 100) if v["count"] else 0
         result.append({
-            "week": k,
+            "week": f"{year}-W{week:02d}",
             "count": v["count"],
             "success_rate": success_rate,
             "active_projects": len(v["projects"]),
@@ -325,6 +731,11 @@ def compute_temporal_stats(facets):
     return result
 
 
+# Path components that mark the start of the interesting project path
+_PROJECT_MARKERS = frozenset({"code", "projects", "writing", "scratch"})
+
+
+@lru_cache(maxsize=4096)
 def demangle_project_name(encoded_name):
     """Convert encoded project directory name to human-readable form.
 
@@ -334,10 +745,11 @@ def demangle_project_name(encoded_name):
     """
     parts = encoded_name.split("-")
 
-    # Find the code/projects/writing directory marker
-    markers = {"code", "projects", "writing", "scratch"}
+    # Find the code/projects/writing directory marker. The encoding is
+    # already lowercase in practice, so skip the .lower() allocation
+    # unless a part actually has uppercase in it
     for i, part in enumerate(parts):
-        if part.lower() in markers:
+        if (part if part.islower() else part.lower()) in _PROJECT_MARKERS:
             remainder = parts[i + 1:]
             if remainder:
                 return "/".join(remainder)
@@ -357,9 +769,23 @@ def list_projects(facets_dir):
     Returns:
         List of (human_name, encoded_name, count) tuples sorted by count desc.
     """
-    facets = load_all_facets(facets_dir)
+    facets_dir = Path(facets_dir)
+    if (facets_dir / DB_NAME).exists():
+        conn = _connect_db(facets_dir)
+        try:
+            return [
+                (demangle_project_name(encoded), encoded, count)
+                for encoded, count in conn.execute(
+                    "SELECT project, COUNT(*) FROM facets"
+                    " GROUP BY project ORDER BY 2 DESC"
+                )
+            ]
+        finally:
+            conn.close()
+
+    # No index — tally from the facet files without loading them all
     project_counts = defaultdict(int)
-    for f in facets:
+    for f in _scan_facet_files(facets_dir) if facets_dir.exists() else ():
         project_counts[f.get("project", "unknown")] += 1
 
     result = []